@@ -2,20 +2,397 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
+import numpy as np
+import numba
+from scipy import stats
 from mpl_toolkits.mplot3d import Axes3D
 import time
 import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # st.set_page_config(layout="wide", page_icon="🔋")
 st.set_page_config(layout="wide", page_icon="⚡")
 
+# Narrow dtypes for the known battery columns
+column_dtypes = {
+    'cycle': 'int32',
+    'voltage_measured': 'float32',
+    'current_measured': 'float32',
+    'temperature_measured': 'float32',
+    'SOH': 'float32',
+    'battery': 'category',
+}
+
 # Function to load data with caching
 @st.cache_data
 def load_data(file):
-    data = pd.read_csv(file)
+    # Parse with the multithreaded Arrow reader
+    data = pd.read_csv(file, engine='pyarrow', dtype=column_dtypes)
+
+    # Downcast any other 64-bit columns to halve the memory every plot has to scan
+    # Floats are narrowed unless their magnitude exceeds float32's 24-bit mantissa, so timestamp-like columns such
+    # as epoch seconds keep full precision
+    for col in data.select_dtypes('float64').columns:
+        if data[col].abs().max() < 2 ** 24:
+            data[col] = data[col].astype('float32')
+    int32_range = np.iinfo(np.int32)
+    for col in data.select_dtypes('int64').columns:
+        if data[col].between(int32_range.min, int32_range.max).all():
+            data[col] = data[col].astype('int32')
     return data
 
+# Numba kernel: mean of one column per group, skipping rows without a group (-1) and NaN values. Sums accumulate
+# straight into the caller's output row, so each call only allocates an int32 count per group; releases the GIL so
+# columns can run on separate threads
+@numba.njit(cache=True, nogil=True)
+def group_mean(group_ids, values, out):
+    counts = np.zeros(out.shape[0], dtype=np.int32)
+    out[:] = 0.0
+    for i in range(group_ids.shape[0]):
+        g = group_ids[i]
+        if g >= 0 and not np.isnan(values[i]):
+            out[g] += values[i]
+            counts[g] += 1
+
+    for g in range(out.shape[0]):
+        out[g] = out[g] / counts[g] if counts[g] > 0 else np.nan
+
+# Function to split cycles 0..max_cycle into num_bins equal bins, returning the step size and the bin labels.
+# Cycles past the last edge go into the last bin, so that bin is labelled closed when it ends exactly at max_cycle
+def cycle_bins(max_cycle, num_bins=10):
+    step_size = max(1, max_cycle // num_bins)  # Ensure step size is at least 1
+    n_bins = max(1, len(range(0, max_cycle + step_size, step_size)) - 1)
+    labels = [f"[{b * step_size}, {(b + 1) * step_size})" for b in range(n_bins)]
+    if n_bins * step_size == max_cycle:
+        labels[-1] = f"[{(n_bins - 1) * step_size}, {max_cycle}]"
+    return step_size, np.array(labels)
+
+# Function to average columns per cycle bin and time, keeping only the (bin, time) cells that occur in the data
+def aggregate_by_cycle_bin(data, columns, num_bins=10):
+    cycle = data['cycle'].to_numpy(dtype=np.int64)
+    step_size, labels = cycle_bins(int(cycle.max()), num_bins)
+    n_bins = len(labels)
+    # Factorize the shared time column once for every column; the codes are int32 whenever every (bin, time) key
+    # below fits, which halves the bytes hashed when numbering the cells
+    time_idx, time_values = pd.factorize(data['time'], sort=True)
+    n_times = len(time_values)
+    key_dtype = np.int32 if n_bins * n_times <= np.iinfo(np.int32).max else np.int64
+    time_idx = time_idx.astype(key_dtype)
+
+    # Number the observed (bin, time) cells through one compact key, so memory follows the number of rows rather
+    # than bins x distinct times
+    valid = (cycle >= 0) & (time_idx >= 0)
+    bin_ids = np.minimum(cycle[valid] // step_size, n_bins - 1).astype(key_dtype)
+    cell_ids, cells = pd.factorize(bin_ids * n_times + time_idx[valid], sort=True)
+    group_ids = np.full(len(cycle), -1, dtype=np.int32)
+    group_ids[valid] = cell_ids
+    del valid, cell_ids
+
+    # The per-column reductions are independent, so run them concurrently. Every thread writes its own row of one
+    # shared output, and columns are passed in their loaded dtype rather than as float64 copies
+    means = np.empty((len(columns), len(cells)))
+    with ThreadPoolExecutor(max_workers=len(columns)) as executor:
+        list(executor.map(lambda j: group_mean(group_ids, data[columns[j]].to_numpy(), means[j]), range(len(columns))))
+
+    bin_ids, time_ids = np.divmod(cells, n_times)
+    aggregated = pd.DataFrame({'cycle_bin': pd.Categorical.from_codes(bin_ids, labels), 'time': time_values[time_ids]})
+    for col, col_means in zip(columns, means):
+        aggregated[col] = col_means
+    return aggregated
+
+
+# Function to merge per-chunk partial aggregates that share an index
+def merge_partials(total, part, how):
+    if total is None:
+        return part
+    return pd.concat([total, part]).groupby(level=list(range(part.index.nlevels)), observed=True).agg(how)
+
+# Function to classify the time column from a sample: 'number', 'datetime' for timestamp strings pandas can parse
+# (as pyarrow does on the in-memory path) or 'other'
+def time_kind(times):
+    if pd.api.types.is_numeric_dtype(times):
+        return 'number'
+    sample = times.dropna().head(1000)
+    return 'datetime' if pd.to_datetime(sample, errors='coerce').notna().all() else 'other'
+
+# Function to turn a chunk's time column into sortable values plus a mask of usable rows: float64 for numbers,
+# int64 nanoseconds for timestamps and the raw values for anything else
+def time_values(times, kind):
+    if kind == 'number':
+        values = pd.to_numeric(times, errors='coerce').to_numpy(dtype=np.float64)
+        return values, ~np.isnan(values)
+    if kind == 'datetime':
+        parsed = pd.to_datetime(times, errors='coerce')
+        return parsed.to_numpy(dtype='datetime64[ns]').view(np.int64), parsed.notna().to_numpy()
+    return times.to_numpy(dtype=object), times.notna().to_numpy()
+
+# Function to read a CSV too large for memory chunk by chunk, keeping only the aggregates the dashboard plots
+@st.cache_data
+def load_data_chunked(file, chunksize=1_000_000, num_bins=10, max_values=20, max_times=2000, max_distinct=10_000):
+    trend_cols = ['temperature_measured', 'current_measured', 'voltage_measured']
+    corr_cols = ['voltage_measured', 'current_measured', 'temperature_measured', 'SOH']
+    moments = {'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 'min': 'min', 'max': 'max'}
+
+    # First pass over the cycle and time columns only, to fix the cycle bins and the time grid before aggregating
+    file.seek(0)
+    max_cycle, kind, time_min, time_max, distinct_times = 0, None, np.inf, -np.inf, np.array([])
+    for chunk in pd.read_csv(file, usecols=['cycle', 'time'], dtype=column_dtypes, chunksize=chunksize):
+        max_cycle = max(max_cycle, int(chunk['cycle'].max()))
+        kind = kind or time_kind(chunk['time'])
+        times, usable = time_values(chunk['time'], kind)
+        times = times[usable]
+        if kind != 'other' and len(times):
+            time_min, time_max = min(time_min, times.min()), max(time_max, times.max())
+        if distinct_times is not None:
+            distinct_times = np.union1d(distinct_times, times) if len(distinct_times) else np.unique(times)
+            if len(distinct_times) > max_times:
+                distinct_times = None
+    step_size, labels = cycle_bins(max_cycle, num_bins)
+    if distinct_times is None and kind == 'other':
+        raise ValueError(f"The time column has more than {max_times} distinct values that are neither numbers nor "
+                         "timestamps, so it cannot be aggregated in chunks.")
+
+    # Trend cells keep exact times when there are at most max_times of them, otherwise max_times equal-width
+    # time buckets plotted at their centres, so the trend arrays have a fixed size whatever the row count
+    if distinct_times is not None:
+        time_edges = time_points = distinct_times
+    else:
+        time_edges = np.linspace(time_min, time_max, max_times + 1)
+        time_points = (time_edges[:-1] + time_edges[1:]) / 2
+        time_edges = time_edges[:-1]
+    n_times, n_cells = len(time_edges), len(labels) * len(time_edges)
+    rows_per_cell = np.zeros(n_cells, dtype=np.int64)
+    trend_sums = np.zeros((len(trend_cols), n_cells))
+    trend_counts = np.zeros((len(trend_cols), n_cells), dtype=np.int64)
+
+    preview, n_columns = None, 0
+    categorical_cols, numerical_cols, unique_values = [], [], {}
+    column_stats = soh_stats = soh_by_cycle = None
+    n_complete, col_sums, cross_products = 0, np.zeros(len(corr_cols)), np.zeros((len(corr_cols), len(corr_cols)))
+
+    file.seek(0)
+    for chunk in pd.read_csv(file, dtype=column_dtypes, chunksize=chunksize):
+        if preview is None:
+            preview, n_columns = chunk.head(1000), chunk.shape[1]
+            categorical_cols = list(chunk.select_dtypes(include=['object', 'category']).columns)
+            numerical_cols = list(chunk.select_dtypes(include='number').columns)
+
+        # Column summary: distinct categories in order of appearance, tracked up to max_distinct per column, and
+        # running moments of numeric columns
+        for col in categorical_cols:
+            seen = unique_values.setdefault(col, {})
+            if len(seen) < max_distinct:
+                seen.update(dict.fromkeys(chunk[col].dropna().unique()))
+                if len(seen) > max_distinct:
+                    unique_values[col] = dict.fromkeys(list(seen)[:max_distinct])
+        # The parser infers dtypes per chunk, so coerce rather than cast in case a later chunk holds text
+        numeric = chunk[numerical_cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+        column_stats = merge_partials(column_stats, pd.DataFrame({
+            'count': numeric.count(), 'sum': numeric.sum(), 'sumsq': (numeric ** 2).sum(),
+            'min': numeric.min(), 'max': numeric.max(),
+        }), moments)
+
+        # SOH per battery and cycle for plot 1, and its per-battery moments for plot 3
+        soh = chunk['SOH'].astype('float64')
+        soh_by_cycle = merge_partials(
+            soh_by_cycle, soh.groupby([chunk['battery'], chunk['cycle']], observed=True).agg(['sum', 'count']), 'sum')
+        soh_stats = merge_partials(soh_stats, pd.DataFrame({
+            'count': soh.notna(), 'sum': soh, 'sumsq': soh ** 2, 'min': soh, 'max': soh,
+        }).groupby(chunk['battery'], observed=True).agg(moments), moments)
+
+        # Sums and cross products of NaN-free rows give the Pearson correlation in closed form
+        mat = chunk[corr_cols].to_numpy(dtype=np.float64)
+        mat = mat[~np.isnan(mat).any(axis=1)]
+        n_complete += len(mat)
+        col_sums += mat.sum(axis=0)
+        cross_products += mat.T @ mat
+
+        # Sums and counts per cycle bin and time cell for plots 4-6, added into the fixed-size arrays
+        cycle = chunk['cycle'].to_numpy(dtype=np.int64)
+        times, usable = time_values(chunk['time'], kind)
+        valid = (cycle >= 0) & usable
+        time_ids = np.maximum(np.searchsorted(time_edges, times[valid], side='right') - 1, 0)
+        cells = np.minimum(cycle[valid] // step_size, len(labels) - 1) * n_times + time_ids
+        rows_per_cell += np.bincount(cells, minlength=n_cells)
+        for j, col in enumerate(trend_cols):
+            values = chunk[col].to_numpy(dtype=np.float64)[valid]
+            observed = ~np.isnan(values)
+            trend_sums[j] += np.bincount(cells[observed], weights=values[observed], minlength=n_cells)
+            trend_counts[j] += np.bincount(cells[observed], minlength=n_cells)
+
+    # Columns that reached max_distinct report a lower bound on their distinct count
+    n_unique = {col: len(values) if len(values) < max_distinct else f"≥ {max_distinct}"
+                for col, values in unique_values.items()}
+    unique_values = {col: (n_unique[col], list(values)[:max_values]) for col, values in unique_values.items()}
+    count = column_stats['count']
+    mean = column_stats['sum'] / count
+    std = np.sqrt(((column_stats['sumsq'] - count * mean ** 2) / (count - 1)).clip(lower=0))
+    numerical_summary = pd.DataFrame({'count': count, 'mean': mean, 'std': std,
+                                      'min': column_stats['min'], 'max': column_stats['max']}).T[numerical_cols]
+
+    soh_by_cycle = (soh_by_cycle['sum'] / soh_by_cycle['count']).rename('SOH').reset_index()
+    soh_by_cycle['battery'] = soh_by_cycle['battery'].astype('category')
+    soh_stats['mean'] = soh_stats['sum'] / soh_stats['count']
+    soh_stats['std'] = np.sqrt((soh_stats['sumsq'] / soh_stats['count'] - soh_stats['mean'] ** 2).clip(lower=0))
+
+    covariance = cross_products - np.outer(col_sums, col_sums) / n_complete
+    scale = np.sqrt(np.diag(covariance))
+    corr_matrix = pd.DataFrame(covariance / np.outer(scale, scale), index=corr_cols, columns=corr_cols)
+
+    if kind == 'datetime':
+        time_points = time_points.astype(np.int64).view('datetime64[ns]')
+    cells = np.flatnonzero(rows_per_cell)
+    bin_ids, time_ids = np.divmod(cells, n_times)
+    trends = pd.DataFrame({'cycle_bin': pd.Categorical.from_codes(bin_ids, labels), 'time': time_points[time_ids]})
+    for j, col in enumerate(trend_cols):
+        counts = trend_counts[j, cells]
+        trends[col] = trend_sums[j, cells] / np.where(counts > 0, counts, np.nan)
+
+    return {
+        'preview': preview,
+        'n_columns': n_columns,
+        'summary': (categorical_cols, numerical_cols, unique_values, numerical_summary),
+        'soh_by_cycle': soh_by_cycle,
+        'soh_stats': soh_stats[['mean', 'std', 'min', 'max']],
+        'corr_matrix': corr_matrix,
+        'trends': trends,
+    }
+
+# Numba kernel: Largest-Triangle-Three-Buckets, picking n_out indices that preserve the visual shape of a line
+@numba.njit(cache=True)
+def lttb_indices(x, y, n_out):
+    n = x.shape[0]
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[n_out - 1] = n - 1
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        # Average point of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Point of the current bucket forming the largest triangle with the previous pick and that average
+        max_area = -1.0
+        chosen = int(i * every) + 1
+        for j in range(int(i * every) + 1, next_start):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        idx[i + 1] = chosen
+        a = chosen
+    return idx
+
+# Function to downsample every line of a long-format dataframe to at most n_out points, keeping row order.
+# LTTB needs a numeric x axis, so datetimes go through their int64 view and any other x (e.g. timestamps pyarrow
+# left as strings) falls back to a plain stride
+def downsample_lines(data, x, y, group, n_out=2000):
+    if pd.api.types.is_datetime64_any_dtype(data[x]):
+        x_values = data[x].to_numpy(dtype='datetime64[ns]').view(np.int64).astype(np.float64)
+    elif pd.api.types.is_numeric_dtype(data[x]):
+        x_values = data[x].to_numpy(dtype=np.float64)
+    else:
+        x_values = None
+    y_values = data[y].to_numpy(dtype=np.float64)
+
+    keep = []
+    for positions in data.groupby(group, observed=True, sort=False).indices.values():
+        if x_values is not None:
+            keep.append(positions[lttb_indices(x_values[positions], y_values[positions], n_out)])
+        else:
+            keep.append(positions[::int(np.ceil(len(positions) / n_out))])
+    return data.iloc[np.sort(np.concatenate(keep))]
+
+# Function to compute a content hash of a dataframe, used as the cache key for the plots
+def hash_dataframe(data):
+    return hashlib.md5(pd.util.hash_pandas_object(data, index=True).values).hexdigest()
+
+# Function to summarize column types for the sidebar, listing at most max_values categories per column
+@st.cache_data
+def summarize_columns(data_hash, _data, max_values=20):
+    categorical_cols = _data.select_dtypes(include=['object', 'category']).columns
+    numerical_cols = _data.select_dtypes(include='number').columns
+    unique_values = {col: (_data[col].nunique(), list(_data[col].unique()[:max_values])) for col in categorical_cols}
+    return categorical_cols, numerical_cols, unique_values, _data[numerical_cols].describe()
+
+# Function to map each battery to a plot color; batteries come from the category metadata, not a column scan
+@st.cache_data
+def get_battery_colors(data_hash, _data):
+    batteries = _data['battery'].cat.categories.to_numpy()
+    dark_mode_colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+    palette = [dark_mode_colors[i % len(dark_mode_colors)] for i in range(len(batteries))]
+    return batteries, dict(zip(batteries, palette))
+
+# Cached plot builders: the dataframe argument is skipped by Streamlit's hasher and data_hash is the key
+@st.cache_data
+def build_soh_line(data_hash, _data, batteries, battery_color_map):
+    fig = px.line(downsample_lines(_data, 'cycle', 'SOH', 'battery'), x='cycle', y='SOH', color='battery',
+                  color_discrete_map=battery_color_map,
+                  title='State of Health (SOH) Over Cycles',
+                  category_orders={"battery": batteries},
+                  render_mode='webgl')
+    fig.update_layout(legend_title_text="Battery")
+    return fig
+
+@st.cache_data
+def get_correlation_matrix(data_hash, _data):
+    # Pearson correlation via one BLAS-backed np.corrcoef on a contiguous float32 matrix, over rows without NaNs
+    cols = ['voltage_measured', 'current_measured', 'temperature_measured', 'SOH']
+    mat = np.ascontiguousarray(_data[cols].to_numpy(dtype=np.float32))
+    nan_rows = np.isnan(mat).any(axis=1)
+    if nan_rows.any():
+        mat = mat[~nan_rows]
+    return pd.DataFrame(np.corrcoef(mat, rowvar=False, dtype=np.float32), index=cols, columns=cols)
+
+@st.cache_data
+def build_corr_heatmap(data_hash, _corr_matrix):
+    return px.imshow(_corr_matrix, text_auto=".2f", title='Correlation Heatmap', color_continuous_scale='Inferno')
+
+@st.cache_data
+def get_soh_stats(data_hash, _data):
+    # One groupby gives the per-battery moments behind each normal curve (population std, as norm.fit uses)
+    soh_by_battery = _data.groupby('battery', observed=True)['SOH']
+    return pd.DataFrame({
+        'mean': soh_by_battery.mean(),
+        'std': soh_by_battery.std(ddof=0),
+        'min': soh_by_battery.min(),
+        'max': soh_by_battery.max(),
+    }).astype('float64')
+
+@st.cache_data
+def build_soh_normal_curves(data_hash, _soh_stats, batteries, battery_color_map):
+    # A fitted normal curve per battery over its own SOH range, evaluated on a 500-point grid
+    fig = go.Figure()
+    for battery in batteries:
+        mean, std, soh_min, soh_max = _soh_stats.loc[battery, ['mean', 'std', 'min', 'max']]
+        xs = np.linspace(soh_min, soh_max, 500, endpoint=False)
+        fig.add_trace(go.Scatter(x=xs, y=stats.norm.pdf(xs, loc=mean, scale=std), mode='lines', name=battery,
+                                 line_color=battery_color_map[battery]))
+
+    fig.update_layout(
+        title_text='SOH Distribution Curve',
+        xaxis_title_text='SOH',
+        yaxis_title_text='Density',
+        legend_title_text='Battery'
+    )
+    return fig
+
+@st.cache_data
+def get_cycle_bin_trends(data_hash, _data):
+    return aggregate_by_cycle_bin(_data, ['temperature_measured', 'current_measured', 'voltage_measured'])
+
+@st.cache_data
+def build_binned_line(var, data_hash, _trends):
+    trends = downsample_lines(_trends, 'time', var, 'cycle_bin')
+    return px.line(trends, x='time', y=var, color='cycle_bin', title=f'{var} Trend over Time', render_mode='webgl')
+
 
 image_path = "logo3.png"
 # st.image(image_path, width=300, use_column_width=False)
@@ -29,14 +406,14 @@ def encode_image_to_base64(image_path):
         encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
     return encoded_string
 
-# Encode the image
-encoded_image = encode_image_to_base64(image_path)
-
-# Create the HTML content with the Base64 encoded image
-markdown_content = f'<a href="{url}" target="_blank"><img src="data:image/png;base64,{encoded_image}" width="300"></a>'
+# Function to build the clickable logo HTML once per server process instead of on every rerun
+@st.cache_resource
+def get_logo_markdown(image_path, url):
+    encoded_image = encode_image_to_base64(image_path)
+    return f'<a href="{url}" target="_blank"><img src="data:image/png;base64,{encoded_image}" width="300"></a>'
 
 # Render the Markdown content
-st.markdown(markdown_content, unsafe_allow_html=True)
+st.markdown(get_logo_markdown(image_path, url), unsafe_allow_html=True)
 
 
 # Set the title of the app
@@ -59,54 +436,87 @@ uploaded_file = st.sidebar.file_uploader("Choose a file", type=["csv"])
 if 'streamed' not in st.session_state:
     st.session_state.streamed = False
 
-def stream_words():
-    words = markdown_text.split(" ")
-    for word in words:
-        yield word + " "
-        time.sleep(0.12)  # Adjust speed here
+# Remember which upload insights were generated for, so reruns from widgets keep the dashboard on screen
+if 'insights_file' not in st.session_state:
+    st.session_state.insights_file = None
+
+# Stream the welcome text a line at a time so the server thread is only held for a fraction of a second
+def stream_lines():
+    for line in markdown_text.splitlines(keepends=True):
+        yield line
+        time.sleep(0.05)  # Adjust speed here
 
-# Stream words only if not already streamed
+# Stream lines only if not already streamed
 if not st.session_state.streamed:
-    st.write_stream(stream_words)
+    st.write_stream(stream_lines)
     st.session_state.streamed = True
 
 # Button to trigger data processing
 if uploaded_file is not None:
+    # Large files are aggregated chunk by chunk so memory stays bounded regardless of file size. The default
+    # threshold sits below Streamlit's 200 MB upload limit (server.maxUploadSize) so it can actually be reached
+    read_in_chunks = st.sidebar.checkbox("Read file in chunks", value=uploaded_file.size > 100 * 1024 ** 2,
+                                         help="Aggregate the CSV in chunks instead of loading it into memory at once.")
+
     if st.sidebar.button("Generate Insights"):
-    
-        # Simulate loading time
-        df = load_data(uploaded_file)
-        temp = df.copy()  # Create a copy of the dataframe for plotting
+        st.session_state.insights_file = uploaded_file.file_id
+
+    if st.session_state.insights_file == uploaded_file.file_id:
+
+        if read_in_chunks:
+            try:
+                chunked = load_data_chunked(uploaded_file)
+            except ValueError as error:
+                st.error(str(error))
+                st.stop()
+            # The upload's id is the cache key for the plots built from the chunked aggregates
+            data_hash = uploaded_file.file_id
+            df, n_columns = chunked['preview'], chunked['n_columns']
+            categorical_cols, numerical_cols, unique_values, numerical_summary = chunked['summary']
+            soh_data, soh_stats = chunked['soh_by_cycle'], chunked['soh_stats']
+            corr_matrix, trends = chunked['corr_matrix'], chunked['trends']
+        else:
+            df = load_data(uploaded_file)
+            # Content hash of the data, the cache key for the summary and plots so repeated runs are instant
+            data_hash = hash_dataframe(df)
+            n_columns = df.shape[1]
+            categorical_cols, numerical_cols, unique_values, numerical_summary = summarize_columns(data_hash, df)
+            soh_data = df
+            soh_stats = get_soh_stats(data_hash, df)
+            corr_matrix = get_correlation_matrix(data_hash, df)
+            trends = get_cycle_bin_trends(data_hash, df)
 
         # Display success message in the sidebar
         st.sidebar.success("Data uploaded successfully!")
 
         # Data Summary in the sidebar
         st.sidebar.header("Summary Statistics")
-        st.sidebar.write("Total Columns:", df.shape[1])
+        st.sidebar.write("Total Columns:", n_columns)
 
         # Categorical columns summary
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
         st.sidebar.write("#### Categorical Columns:", len(categorical_cols))
         for i, col in enumerate(categorical_cols):
             st.sidebar.write(f"{i+1}. {col}")
 
         st.sidebar.write("Unique Categories in Categorical Columns:")
         for col in categorical_cols:
-            st.sidebar.markdown(f"{col}: {df[col].unique()}")
+            n_unique, values = unique_values[col]
+            st.sidebar.markdown(f"{col} ({n_unique} unique): {values}{'…' if n_unique != len(values) else ''}")
 
         # Numerical columns summary
-        numerical_cols = df.select_dtypes(include=['float64', 'int64']).columns
         st.sidebar.write("#### Numerical Columns:", len(numerical_cols))
         for i, col in enumerate(numerical_cols):
             st.sidebar.markdown(f"{i+1}. {col}")
 
         st.sidebar.write("Numerical Summary:")
-        st.sidebar.write(df[numerical_cols].describe())
+        st.sidebar.write(numerical_summary)
 
             # Main window content
         with st.expander("View Data"):
-            st.dataframe(df, use_container_width=True)
+            # Only ship rows to the browser on request, and at most the first 1000
+            if st.checkbox("Load data preview"):
+                st.dataframe(df.head(1000), use_container_width=True)
+                st.caption("Showing up to the first 1,000 rows.")
 
         st.write("## Data Analysis")
 
@@ -121,96 +531,37 @@ if uploaded_file is not None:
             col1, col2, col3 = st.columns(3)
 
             # Define the color combination and battery sequence
-            batteries = df['battery'].unique()
-            dark_mode_colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-            battery_color_map = {battery: dark_mode_colors[i % len(dark_mode_colors)] for i, battery in enumerate(batteries)}
+            batteries, battery_color_map = get_battery_colors(data_hash, soh_data)
 
             # Plot 1: SOH vs Cycle for Each Battery
             with col1:
-                fig = px.line(df, x='cycle', y='SOH', color='battery',
-                              color_discrete_map=battery_color_map,
-                              title='State of Health (SOH) Over Cycles',
-                              category_orders={"battery": batteries})
-                fig.update_layout(legend_title_text="Battery")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_soh_line(data_hash, soh_data, batteries, battery_color_map), use_container_width=True)
                 progress_bar.progress(1 / progress_steps)
-                time.sleep(1)  # Simulate time taken to generate the plot
 
             # Plot 2: Correlation Heatmap
             with col2:
-                corr_matrix = temp[['voltage_measured', 'current_measured', 'temperature_measured', 'SOH']].corr(numeric_only=True)
-                fig = px.imshow(corr_matrix, text_auto=".2f", title='Correlation Heatmap', color_continuous_scale='Inferno')
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_corr_heatmap(data_hash, corr_matrix), use_container_width=True)
                 progress_bar.progress(2 / progress_steps)
-                time.sleep(1)  # Simulate time taken to generate the plot
 
             # Plot 3: Distribution Curve for SOH for Each Battery
             with col3:
-                hist_data = [df[df['battery'] == battery]['SOH'] for battery in batteries]
-                group_labels = batteries
-
-                fig = ff.create_distplot(hist_data, group_labels, colors=[battery_color_map[battery] for battery in batteries],
-                                        show_hist=False, show_rug=False, curve_type='normal')
-
-                # Update layout and add opacity to the filled area
-                for i in range(len(fig.data)):
-                    fig.data[i].line.color = battery_color_map[group_labels[i]]
-                    fig.data[i].fillcolor = battery_color_map[group_labels[i]]
-
-                fig.update_layout(
-                    title_text='SOH Distribution Curve',
-                    xaxis_title_text='SOH',
-                    yaxis_title_text='Density',
-                    legend_title_text='Battery'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_soh_normal_curves(data_hash, soh_stats, batteries, battery_color_map), use_container_width=True)
                 progress_bar.progress(3 / progress_steps)
-                time.sleep(1)  # Simulate time taken to generate the plot
 
             # Plot 4: Lineplot for temperature_measured
             with col1:
-                var = 'temperature_measured'
-                num_bins = 10
-                x = temp[(temp['cycle'] >= 0) & (temp['cycle'] <= temp['cycle'].max())]
-                max_cycle = x['cycle'].max()
-                step_size = max(1, max_cycle // num_bins)  # Ensure step size is at least 1
-                bin_edges = range(0, max_cycle + step_size, step_size)
-                x['cycle_bin'] = pd.cut(x['cycle'], bins=bin_edges, right=False)
-                aggregated_data = x.groupby(['cycle_bin', 'time'], as_index=False, observed=True)[var].mean()
-                fig = px.line(aggregated_data, x='time', y=var, color='cycle_bin', title=f'{var} Trend over Time')
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_binned_line('temperature_measured', data_hash, trends), use_container_width=True)
                 progress_bar.progress(4 / progress_steps)
-                time.sleep(1)  # Simulate time taken to generate the plot
 
             # Plot 5: Lineplot for current_measured
             with col2:
-                var = 'current_measured'
-                num_bins = 10
-                x = temp[(temp['cycle'] >= 0) & (temp['cycle'] <= temp['cycle'].max())]
-                max_cycle = x['cycle'].max()
-                step_size = max(1, max_cycle // num_bins)  # Ensure step size is at least 1
-                bin_edges = range(0, max_cycle + step_size, step_size)
-                x['cycle_bin'] = pd.cut(x['cycle'], bins=bin_edges, right=False)
-                aggregated_data = x.groupby(['cycle_bin', 'time'], as_index=False, observed=True)[var].mean()
-                fig = px.line(aggregated_data, x='time', y=var, color='cycle_bin', title=f'{var} Trend over Time')
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_binned_line('current_measured', data_hash, trends), use_container_width=True)
                 progress_bar.progress(5 / progress_steps)
-                time.sleep(1)  # Simulate time taken to generate the plot
 
             # Plot 6: Lineplot for voltage_measured
             with col3:
-                var = 'voltage_measured'
-                num_bins = 10
-                x = temp[(temp['cycle'] >= 0) & (temp['cycle'] <= temp['cycle'].max())]
-                max_cycle = x['cycle'].max()
-                step_size = max(1, max_cycle // num_bins)  # Ensure step size is at least 1
-                bin_edges = range(0, max_cycle + step_size, step_size)
-                x['cycle_bin'] = pd.cut(x['cycle'], bins=bin_edges, right=False)
-                aggregated_data = x.groupby(['cycle_bin', 'time'], as_index=False, observed=True)[var].mean()
-                fig = px.line(aggregated_data, x='time', y=var, color='cycle_bin', title=f'{var} Trend over Time')
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_binned_line('voltage_measured', data_hash, trends), use_container_width=True)
                 progress_bar.progress(6 / progress_steps)
-                time.sleep(1)  # Simulate time taken to generate the plot
             # Remove the spinner once all plots are generated
             st.spinner()
 